@@ -4,7 +4,8 @@ Analyze motifs to identify disconnected components
 """
 import json
 import numpy as np
-import networkx as nx
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 # Load motif data
 with open('facebook_motifs.json', 'r') as f:
@@ -13,18 +14,17 @@ with open('facebook_motifs.json', 'r') as f:
 def analyze_motif_connectivity(motif_id, motif_info):
     """Analyze if a motif has disconnected components"""
     nodes = motif_info['nodes']
-    adj_matrix = np.array(motif_info['adjacency_matrix'])
+    # Only edge presence matters here, so keep one byte per cell; bool (not
+    # uint8) so fractional or >255 weights still count as edges
+    adj_matrix = np.asarray(motif_info['adjacency_matrix'], dtype=bool)
     
-    # Create NetworkX graph from adjacency matrix
-    G = nx.from_numpy_array(adj_matrix)
-    
-    # Check connectivity
-    num_components = nx.number_connected_components(G)
-    components = list(nx.connected_components(G))
+    # Check connectivity directly on the sparse adjacency matrix
+    num_components, component_labels = connected_components(csr_matrix(adj_matrix), directed=False)
+    component_sizes = np.bincount(component_labels, minlength=num_components)
     
     # Find isolated nodes (degree 0)
-    degrees = dict(G.degree())
-    isolated_nodes = [i for i, deg in degrees.items() if deg == 0]
+    degrees = adj_matrix.sum(axis=1, dtype=np.int32)
+    isolated_nodes = np.flatnonzero(degrees == 0).tolist()
     
     return {
         'motif_id': motif_id,
@@ -32,7 +32,7 @@ def analyze_motif_connectivity(motif_id, motif_info):
         'num_components': num_components,
         'is_connected': num_components == 1,
         'isolated_nodes': len(isolated_nodes),
-        'component_sizes': [len(comp) for comp in components],
+        'component_sizes': component_sizes.tolist(),
         'actual_node_ids': [nodes[i] for i in isolated_nodes] if isolated_nodes else []
     }
 
@@ -4,113 +4,209 @@ Compute Maximum Spanning Trees for all motifs and save to JSON.
 This pre-computes MSTs to avoid calculating them in real-time during visualization.
 """
 
-import json
-from collections import defaultdict
+import multiprocessing as mp
+import os
 
-def find_maximum_spanning_tree(motif):
+import numpy as np
+import orjson
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, minimum_spanning_tree
+
+def motif_to_edge_arrays(motif, all_nodes):
     """
-    Find Maximum Spanning Tree using Prim's algorithm starting from source node.
+    Convert a motif's edge dicts into parallel (structure-of-arrays) columns.
     
     Args:
-        motif: Motif data containing source_node, neighbors, and edges
+        motif: Motif data containing edges
+        all_nodes: Motif node IDs; list positions are the local indices
         
     Returns:
-        dict: MST data with nodes, edges, total_weight, and excluded_edges
+        tuple: (lo, hi, weights) per input edge, with lo <= hi local indices
     """
-    source_node = motif['source_node']
-    all_nodes = [source_node] + motif['neighbors']
     edges = motif['edges']
+    node_index = {node: i for i, node in enumerate(all_nodes)}
+    num_edges = len(edges)
     
-    # Create adjacency list with weights
-    adjacency_list = defaultdict(list)
-    for edge in edges:
-        adjacency_list[edge['from']].append({
-            'node': edge['to'], 
-            'weight': edge['weight']
-        })
-        adjacency_list[edge['to']].append({
-            'node': edge['from'], 
-            'weight': edge['weight']
-        })
+    src = np.fromiter((node_index[e['from']] for e in edges), dtype=np.int64, count=num_edges)
+    dst = np.fromiter((node_index[e['to']] for e in edges), dtype=np.int64, count=num_edges)
+    w = np.fromiter((e['weight'] for e in edges), dtype=np.float64, count=num_edges)
+    
+    return np.minimum(src, dst), np.maximum(src, dst), w
+
+def dedupe_edges(lo, hi, weights):
+    """
+    Collapse parallel edges and drop self-loops.
     
-    # Prim's algorithm for Maximum Spanning Tree
-    mst_edges = []
-    visited = {source_node}
-    total_weight = 0
+    Returns:
+        tuple: (lo, hi, weights) sorted by (lo, hi) with lo < hi; parallel
+        edges keep their maximum weight
+    """
+    order = np.lexsort((-weights, hi, lo))
+    lo, hi, weights = lo[order], hi[order], weights[order]
+    first = np.ones(len(lo), dtype=bool)
+    first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+    keep = first & (lo != hi)  # self-loops never join a spanning tree
+    
+    return lo[keep], hi[keep], weights[keep]
+
+def find_maximum_spanning_trees(motifs):
+    """
+    Find Maximum Spanning Trees for a batch of motifs with one SciPy call.
     
-    while len(visited) < len(all_nodes):
-        max_edge = None
-        max_weight = -1
+    Each motif gets a disjoint range of global node indices, so all motifs
+    stack into one block-diagonal sparse graph and a single compiled
+    minimum_spanning_tree call handles every block. minimum_spanning_tree
+    drops zero entries and zero-weight edges exist in the data, so each
+    weight w is stored as (max_weight + 1) - w > 0; the minimum tree over
+    those costs is a maximum tree over the weights.
+    
+    The trees are then walked breadth-first from each source node, via an
+    extra root linked to every source, so every edge points from parent to
+    child and nodes unreachable from the source are left out (as Prim's
+    algorithm would).
+    
+    Args:
+        motifs: List of motif data containing source_node, neighbors, and edges
         
-        # Find maximum weight edge from visited to unvisited nodes
-        for visited_node in visited:
-            for neighbor in adjacency_list[visited_node]:
-                if neighbor['node'] not in visited and neighbor['weight'] > max_weight:
-                    max_weight = neighbor['weight']
-                    max_edge = {
-                        'from': visited_node,
-                        'to': neighbor['node'],
-                        'weight': neighbor['weight']
-                    }
+    Returns:
+        list: One MST data dict per motif, in input order, with nodes,
+        mst_edges, excluded_edges, total_weight and edge counts
+    """
+    motif_nodes = [[motif['source_node']] + motif['neighbors'] for motif in motifs]
+    sizes = np.array([len(nodes) for nodes in motif_nodes], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    total_nodes = int(offsets[-1])
+    
+    # Stack every motif's edges into global index space
+    edge_arrays = [
+        motif_to_edge_arrays(motif, nodes)
+        for motif, nodes in zip(motifs, motif_nodes)
+    ]
+    lo, hi, weights = dedupe_edges(
+        np.concatenate([a[0] + offset for a, offset in zip(edge_arrays, offsets)] + [np.empty(0, np.int64)]),
+        np.concatenate([a[1] + offset for a, offset in zip(edge_arrays, offsets)] + [np.empty(0, np.int64)]),
+        np.concatenate([a[2] for a in edge_arrays] + [np.empty(0)])
+    )
+    
+    cost = (weights.max() + 1.0) - weights if len(weights) else weights
+    tree = minimum_spanning_tree(csr_matrix((cost, (lo, hi)), shape=(total_nodes, total_nodes))).tocoo()
+    
+    # One BFS from a virtual root (index total_nodes) wired to every source
+    root = total_nodes
+    sources = offsets[:-1]
+    walk = csr_matrix(
+        (
+            np.ones(len(tree.data) + len(sources)),
+            (np.concatenate([tree.row, np.full(len(sources), root)]),
+             np.concatenate([tree.col, sources]))
+        ),
+        shape=(total_nodes + 1, total_nodes + 1)
+    )
+    order, predecessors = breadth_first_order(walk, root, directed=False, return_predecessors=True)
+    
+    # Tree edges in BFS order, grouped per motif block
+    children = order[1:]
+    children = children[predecessors[children] != root]
+    blocks = np.searchsorted(offsets, children, side='right') - 1
+    grouping = np.argsort(blocks, kind='stable')
+    children, blocks = children[grouping], blocks[grouping]
+    parents = predecessors[children]
+    bounds = np.searchsorted(blocks, np.arange(len(motifs) + 1)).tolist()
+    
+    # Look the exact weights back up instead of undoing the cost transform
+    tree_lo, tree_hi = np.minimum(parents, children), np.maximum(parents, children)
+    tree_weights = weights[np.searchsorted(lo * total_nodes + hi, tree_lo * total_nodes + tree_hi)]
+    
+    tree_keys = tree_lo * total_nodes + tree_hi
+    
+    parents = parents.tolist()
+    children = children.tolist()
+    tree_weights = tree_weights.tolist()
+    
+    results = []
+    for k, (motif, nodes) in enumerate(zip(motifs, motif_nodes)):
+        offset = int(offsets[k])
+        mst_edges = [
+            {
+                'from': nodes[parents[e] - offset],
+                'to': nodes[children[e] - offset],
+                'weight': tree_weights[e]
+            }
+            for e in range(bounds[k], bounds[k + 1])
+        ]
+        total_weight = sum(edge['weight'] for edge in mst_edges)
         
-        if max_edge:
-            mst_edges.append(max_edge)
-            visited.add(max_edge['to'])
-            total_weight += max_edge['weight']
-    
-    # Find excluded edges
-    excluded_edges = []
-    for edge in edges:
-        is_in_mst = any(
-            (mst_edge['from'] == edge['from'] and mst_edge['to'] == edge['to']) or
-            (mst_edge['from'] == edge['to'] and mst_edge['to'] == edge['from'])
-            for mst_edge in mst_edges
+        # Excluded edges: one vectorized membership test of every edge's
+        # (lo, hi) key against the tree keys of this motif
+        motif_lo, motif_hi, _ = edge_arrays[k]
+        excluded = np.isin(
+            (motif_lo + offset) * total_nodes + (motif_hi + offset),
+            tree_keys[bounds[k]:bounds[k + 1]],
+            invert=True
         )
-        if not is_in_mst:
-            excluded_edges.append(edge)
-    
-    return {
-        'source_node': source_node,
-        'nodes': all_nodes,
-        'mst_edges': mst_edges,
-        'excluded_edges': excluded_edges,
-        'total_weight': total_weight,
-        'num_mst_edges': len(mst_edges),
-        'num_excluded_edges': len(excluded_edges)
-    }
+        excluded_edges = [motif['edges'][e] for e in np.flatnonzero(excluded).tolist()]
+        
+        results.append({
+            'source_node': motif['source_node'],
+            'nodes': nodes,
+            'mst_edges': mst_edges,
+            'excluded_edges': excluded_edges,
+            'total_weight': total_weight,
+            'num_mst_edges': len(mst_edges),
+            'num_excluded_edges': len(excluded_edges)
+        })
+    
+    return results
+
+def save_mst_data(mst_data, output_file):
+    """Write MSTs to JSON one entry at a time, in compact form."""
+    with open(output_file, 'wb') as f:
+        f.write(b'{')
+        for i, (source_node, mst) in enumerate(mst_data.items()):
+            if i:
+                f.write(b',')
+            f.write(orjson.dumps(str(source_node)) + b':' + orjson.dumps(mst))
+        f.write(b'}')
 
-def compute_all_msts():
-    """Compute MSTs for all motifs and save to JSON."""
+def compute_all_msts(processes=None):
+    """
+    Compute MSTs for all motifs and save to JSON.
+    
+    Motifs are split into one contiguous batch per worker process; each
+    worker runs the batched sparse MST over its share.
+    
+    Args:
+        processes: Number of worker processes (default: os.cpu_count())
+    """
     
     print("Loading motifs data...")
-    with open('data/facebook_motifs.json', 'r') as f:
-        motifs_data = json.load(f)
+    with open('data/facebook_motifs.json', 'rb') as f:
+        motifs_data = orjson.loads(f.read())
     
     motifs = motifs_data['motifs']
     print(f"Computing MSTs for {len(motifs)} motifs...")
     
-    mst_data = {}
-    
-    for i, motif in enumerate(motifs):
-        source_node = motif['source_node']
-        
-        # Skip motifs with only one node (no edges to form MST)
+    # Skip motifs with only one node (no edges to form MST)
+    for motif in motifs:
         if len(motif['neighbors']) == 0:
-            print(f"Skipping motif {source_node}: no neighbors")
-            continue
-        
-        # Compute MST
-        mst = find_maximum_spanning_tree(motif)
-        mst_data[str(source_node)] = mst
-        
-        # Progress indicator
-        if (i + 1) % 50 == 0:
-            print(f"Processed {i + 1}/{len(motifs)} motifs...")
+            print(f"Skipping motif {motif['source_node']}: no neighbors")
+    motifs = [motif for motif in motifs if len(motif['neighbors']) > 0]
+    
+    processes = processes or os.cpu_count() or 1
+    batch_size = max(1, -(-len(motifs) // processes))
+    batches = [motifs[i:i + batch_size] for i in range(0, len(motifs), batch_size)]
+    
+    # imap (not imap_unordered) keeps the output file in motif order
+    mst_data = {}
+    with mp.Pool(processes) as pool:
+        for batch_msts in pool.imap(find_maximum_spanning_trees, batches):
+            for mst in batch_msts:
+                mst_data[str(mst['source_node'])] = mst
+            print(f"Processed {len(mst_data)}/{len(motifs)} motifs...")
     
     # Save MST data
     output_file = 'data/facebook_msts.json'
-    with open(output_file, 'w') as f:
-        json.dump(mst_data, f, indent=2)
+    save_mst_data(mst_data, output_file)
     
     print(f"\nMST computation completed!")
     print(f"Results saved to: {output_file}")
@@ -133,8 +229,8 @@ def verify_mst_data():
     """Verify the computed MST data by checking a few examples."""
     
     try:
-        with open('data/facebook_msts.json', 'r') as f:
-            mst_data = json.load(f)
+        with open('data/facebook_msts.json', 'rb') as f:
+            mst_data = orjson.loads(f.read())
         
         print(f"\nVerification: Loaded {len(mst_data)} MSTs")
         
@@ -6,13 +6,18 @@ import json
 import numpy as np
 import networkx as nx
 import pandas as pd
-from sklearn.cluster import AgglomerativeClustering
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.sparse.csgraph import connected_components
 
 # Load data (same as server.py)
 df = pd.read_csv("facebook_weighted_filtered.csv")
 G = nx.Graph()
-for _, row in df.iterrows():
-    G.add_edge(int(row[0]), int(row[1]), weight=float(row[2]))
+edges = df.to_numpy()
+G.add_weighted_edges_from(zip(
+    edges[:, 0].astype(np.int64).tolist(),
+    edges[:, 1].astype(np.int64).tolist(),
+    edges[:, 2].astype(np.float64).tolist()
+))
 
 with open('wasserstein_distances.json', 'r') as f:
     wasserstein_data = json.load(f)
@@ -21,29 +26,50 @@ with open('facebook_motifs.json', 'r') as f:
     motif_data = json.load(f)
 
 # Build distance matrix (same as server.py)
-all_nodes = sorted(set(int(k.split("-")[0]) for k in wasserstein_data.keys()) |
-                   set(int(k.split("-")[1]) for k in wasserstein_data.keys()))
+# Parse every "n1-n2" key once into integer arrays
+pair_keys = [pair.split("-") for pair in wasserstein_data]
+pair_n1 = np.fromiter((int(k[0]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+pair_n2 = np.fromiter((int(k[1]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+pair_dist = np.fromiter(wasserstein_data.values(), dtype=np.float64, count=len(pair_keys))
+
+all_nodes = np.unique(np.concatenate([pair_n1, pair_n2])).tolist()
 node_index = {node: i for i, node in enumerate(all_nodes)}
 index_node = {i: node for node, i in node_index.items()}
 
 N = len(all_nodes)
-dist_matrix = np.full((N, N), fill_value=100.0)
-for pair, dist in wasserstein_data.items():
-    n1, n2 = map(int, pair.split("-"))
-    i, j = node_index[n1], node_index[n2]
-    dist_matrix[i][j] = dist
-    dist_matrix[j][i] = dist
-np.fill_diagonal(dist_matrix, 0.0)
+# Average linkage needs every pair, so pairs missing from wasserstein_data
+# keep the maximal distance 100.0. Only the condensed upper triangle is
+# stored (what scipy's linkage consumes), half the size of an N x N matrix,
+# kept in float64 like server.py: float32 rounding reorders average-linkage
+# merges between near-tied motifs, and linkage converts to float64 anyway.
+density = len(wasserstein_data) / (N * (N - 1) / 2)
+print(f"Measured distance pairs: {len(wasserstein_data)} ({density:.1%} of all pairs)")
+
+# Node ID -> matrix index lookup table, then one fancy-indexed store
+index_lookup = np.full(max(all_nodes) + 1, -1, dtype=np.int64)
+index_lookup[all_nodes] = np.arange(N)
+i = index_lookup[pair_n1]
+j = index_lookup[pair_n2]
+# A node's distance to itself is always 0 and has no condensed slot
+off_diagonal = i != j
+i, j = np.minimum(i, j)[off_diagonal], np.maximum(i, j)[off_diagonal]
+dist_condensed = np.full(N * (N - 1) // 2, fill_value=100.0, dtype=np.float64)
+dist_condensed[N * i - i * (i + 1) // 2 + (j - i - 1)] = pair_dist[off_diagonal]
+
+# Average-linkage dendrogram, cut per threshold below
+linkage_matrix = linkage(dist_condensed, method='average')
+
+# Sparse adjacency of G with a fixed node order, built once so each cluster's
+# connectivity check is a CSR slice instead of a NetworkX subgraph
+graph_nodes = list(G.nodes())
+graph_row = {node: i for i, node in enumerate(graph_nodes)}
+adjacency = nx.to_scipy_sparse_array(G, nodelist=graph_nodes, format='csr')
 
 def analyze_cluster_connectivity(threshold=0.0):
     """Analyze connectivity of clusters formed at given threshold"""
-    model = AgglomerativeClustering(
-        metric='precomputed',
-        distance_threshold=threshold,
-        n_clusters=None,
-        linkage='average'
-    )
-    labels = model.fit_predict(dist_matrix)
+    # Merge only below the threshold, matching AgglomerativeClustering's
+    # distance_threshold (fcluster keeps merges at or below t)
+    labels = fcluster(linkage_matrix, t=np.nextafter(threshold, -np.inf), criterion='distance')
 
     cluster_map = {}
     for idx, label in enumerate(labels):
@@ -56,12 +82,17 @@ def analyze_cluster_connectivity(threshold=0.0):
     disconnected_clusters = 0
     for cluster_id, nodes in cluster_map.items():
         if len(nodes) > 1:  # Only check multi-node clusters
-            subgraph = G.subgraph(nodes)
-            num_components = nx.number_connected_components(subgraph)
+            rows = np.array([graph_row[node] for node in nodes])
+            num_components, component_labels = connected_components(
+                adjacency[rows][:, rows], directed=False
+            )
             
             if num_components > 1:
                 disconnected_clusters += 1
-                components = list(nx.connected_components(subgraph))
+                components = [
+                    [nodes[i] for i in np.flatnonzero(component_labels == c)]
+                    for c in range(num_components)
+                ]
                 print(f"Cluster {cluster_id}: DISCONNECTED")
                 print(f"  - Nodes: {nodes}")
                 print(f"  - {len(nodes)} nodes, {num_components} components")
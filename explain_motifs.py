@@ -3,23 +3,19 @@
 Script to explain the relationship between nodes, edges, and motifs.
 """
 
-import csv
 import json
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
 def analyze_data_structure():
     """Analyze the original data and explain motif generation."""
     
     # Count original edges
-    edge_count = 0
-    unique_nodes = set()
-    
-    with open('facebook_weighted_filtered.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            edge_count += 1
-            unique_nodes.add(int(row['Node1']))
-            unique_nodes.add(int(row['Node2']))
+    df = pd.read_csv('facebook_weighted_filtered.csv', dtype={'Node1': np.int64, 'Node2': np.int64})
+    edge_count = len(df)
+    unique_nodes = np.unique(np.concatenate([df['Node1'].to_numpy(), df['Node2'].to_numpy()]))
     
     print("=== DATA STRUCTURE ANALYSIS ===")
     print(f"Original CSV rows (edges): {edge_count}")
@@ -4,25 +4,24 @@ Motif extraction script for weighted Facebook graph data.
 Extracts one-hop motifs where each motif consists of a source node and its direct neighbors.
 """
 
-import csv
-import json
 import os
 from collections import defaultdict
 
+import numpy as np
+import orjson
+import pandas as pd
+
 def load_graph_data(filepath: str):
-    """Load the weighted graph data from CSV file."""
+    """
+    Load the weighted graph data from CSV file.
+    
+    Returns:
+        tuple: (node1, node2, weight) NumPy arrays, one entry per edge
+    """
     try:
-        edges = []
-        with open(filepath, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                edges.append({
-                    'Node1': int(row['Node1']),
-                    'Node2': int(row['Node2']),
-                    'Weight': float(row['Weight'])
-                })
-        print(f"Loaded graph with {len(edges)} edges")
-        return edges
+        df = pd.read_csv(filepath, dtype={'Node1': np.int64, 'Node2': np.int64, 'Weight': np.float64})
+        print(f"Loaded graph with {len(df)} edges")
+        return df['Node1'].to_numpy(), df['Node2'].to_numpy(), df['Weight'].to_numpy()
     except FileNotFoundError:
         print(f"Error: File {filepath} not found")
         return None
@@ -30,29 +29,54 @@ def load_graph_data(filepath: str):
         print(f"Error loading data: {e}")
         return None
 
-def build_adjacency_list(edges):
+def build_adjacency_list(node1, node2, weight):
     """
-    Build adjacency list representation of the graph.
-    Returns dict where key is node and value is list of connected nodes with weights.
+    Build CSR (compressed sparse row) adjacency of the graph.
+    
+    Nodes get local indices in order of first appearance in the edge list, and
+    each node's neighbors keep edge-list order. Neighbors of local node i are
+    indices[indptr[i]:indptr[i + 1]] with matching weights.
+    
+    Returns:
+        tuple: (node_ids, indptr, indices, weights) NumPy arrays, where
+        node_ids maps local index -> original node ID
     """
-    adjacency_list = defaultdict(list)
+    # Add both directions since it's an undirected graph; interleaving keeps
+    # each node's neighbors in edge-list order after a stable sort
+    tail_ids = np.column_stack([node1, node2]).ravel()
+    head_ids = np.column_stack([node2, node1]).ravel()
+    both_weights = np.repeat(weight, 2)
     
-    for edge in edges:
-        node1, node2, weight = edge['Node1'], edge['Node2'], edge['Weight']
-        
-        # Add both directions since it's an undirected graph
-        adjacency_list[node1].append({'neighbor': node2, 'weight': weight})
-        adjacency_list[node2].append({'neighbor': node1, 'weight': weight})
+    sorted_ids, first_seen, tail_sorted = np.unique(tail_ids, return_index=True, return_inverse=True)
+    appearance = np.argsort(first_seen)
+    local_index = np.empty_like(appearance)
+    local_index[appearance] = np.arange(len(appearance))
+    node_ids = sorted_ids[appearance]
+    tails = local_index[tail_sorted]
+    heads = local_index[np.searchsorted(sorted_ids, head_ids)]
     
-    return dict(adjacency_list)
+    degree = np.bincount(tails, minlength=len(node_ids))
+    indptr = np.concatenate([[0], np.cumsum(degree)])
+    order = np.argsort(tails, kind='stable')
+    
+    return node_ids, indptr, heads[order], both_weights[order]
+
+# Edge type codes used in the columnar motif edge arrays
+EDGE_TYPES = ('source_to_neighbor', 'neighbor_to_neighbor')
+SOURCE_TO_NEIGHBOR, NEIGHBOR_TO_NEIGHBOR = 0, 1
 
-def extract_subgraph_motifs(adjacency_list):
+def extract_subgraph_motifs(node_ids, indptr, indices, weights):
     """
     Extract subgraph motifs from the graph.
     Each motif is a complete subgraph containing:
     1. Source node
     2. All neighbors at distance 1 from source
     3. All edges between those neighbors
+    
+    Takes the CSR arrays from build_adjacency_list. Each motif's edges are
+    kept as parallel NumPy arrays (edge_from, edge_to, edge_weight and
+    edge_type codes into EDGE_TYPES); edge dicts are only created when the
+    motif is serialized (see motif_to_json).
     """
     motifs = []
     motif_stats = {
@@ -62,62 +86,75 @@ def extract_subgraph_motifs(adjacency_list):
         'motif_size_distribution': defaultdict(int)
     }
     
-    for source_node, neighbor_list in adjacency_list.items():
+    node_array, index_array, weight_array = node_ids, indices, weights
+    
+    # Plain lists index much faster than NumPy scalars in the loops below
+    node_ids = node_ids.tolist()
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    num_nodes = len(node_ids)
+    
+    # Edges between neighbors, found per edge rather than per source: edge
+    # (u, v) lies inside the motif of every common neighbor of u and v.
+    # Emitting each edge once from its smaller endpoint avoids A->B / B->A
+    # duplicates, and the work is bounded by the triangle-listing
+    # sum of min(d(u), d(v)) instead of the sum of d^2 over sources.
+    adj_set = [frozenset(indices[indptr[i]:indptr[i + 1]]) for i in range(num_nodes)]
+    neighbor_position = [
+        {neighbor_idx: k for k, neighbor_idx in enumerate(indices[indptr[i]:indptr[i + 1]])}
+        for i in range(num_nodes)
+    ]
+    internal_edges = [[] for _ in range(num_nodes)]
+    for u, u_node in enumerate(node_ids):
+        # Hoist per-node lookups out of the hot inner loops
+        adj_u = adj_set[u]
+        start = indptr[u]
+        for p, v in enumerate(indices[start:indptr[u + 1]], start):
+            if u_node < node_ids[v]:
+                for source_idx in adj_u & adj_set[v]:
+                    # Sort key reproduces the per-neighbor scan order
+                    internal_edges[source_idx].append((neighbor_position[source_idx][u], p))
+    
+    for source_idx, source_node in enumerate(node_ids):
         motif_stats['unique_nodes'].add(source_node)
         
         # Get all neighbors of the source node
-        neighbors = [n['neighbor'] for n in neighbor_list]
+        start, end = indptr[source_idx], indptr[source_idx + 1]
+        neighbor_array = node_array[index_array[start:end]]
+        neighbors = neighbor_array.tolist()
         
         if len(neighbors) == 0:
             continue
-            
+        
+        # Edges from source to all neighbors, then edges between neighbors
+        # (within the motif) in neighbor scan order
+        internal = np.array(sorted(internal_edges[source_idx]), dtype=np.int64).reshape(-1, 2)
+        positions, csr_positions = internal[:, 0], internal[:, 1]
+        
+        edge_from = np.concatenate([np.full(len(neighbors), source_node), neighbor_array[positions]])
+        edge_to = np.concatenate([neighbor_array, node_array[index_array[csr_positions]]])
+        edge_weight = np.concatenate([weight_array[start:end], weight_array[csr_positions]])
+        edge_type = np.repeat(
+            np.array([SOURCE_TO_NEIGHBOR, NEIGHBOR_TO_NEIGHBOR], dtype=np.uint8),
+            [len(neighbors), len(internal)]
+        )
+        
         # Create the motif subgraph
         motif = {
             'motif_id': f"motif_{source_node}",
             'source_node': source_node,
             'neighbors': neighbors,
-            'edges': []
+            'edge_from': edge_from,
+            'edge_to': edge_to,
+            'edge_weight': edge_weight,
+            'edge_type': edge_type
         }
-        
-        # Add edges from source to all neighbors
-        for neighbor_info in neighbor_list:
-            neighbor_node = neighbor_info['neighbor']
-            weight = neighbor_info['weight']
-            
-            edge = {
-                'from': source_node,
-                'to': neighbor_node,
-                'weight': weight,
-                'edge_type': 'source_to_neighbor'
-            }
-            motif['edges'].append(edge)
-            motif_stats['total_edges_in_motifs'] += 1
-        
-        # Find edges between neighbors (within the motif)
-        neighbor_set = set(neighbors)
-        for neighbor in neighbors:
-            if neighbor in adjacency_list:
-                for neighbor_of_neighbor in adjacency_list[neighbor]:
-                    target = neighbor_of_neighbor['neighbor']
-                    weight = neighbor_of_neighbor['weight']
-                    
-                    # If the target is also a neighbor of source (and not source itself)
-                    if target in neighbor_set and target != source_node:
-                        # Avoid duplicate edges (only add if neighbor < target to prevent A->B and B->A)
-                        if neighbor < target:
-                            edge = {
-                                'from': neighbor,
-                                'to': target,
-                                'weight': weight,
-                                'edge_type': 'neighbor_to_neighbor'
-                            }
-                            motif['edges'].append(edge)
-                            motif_stats['total_edges_in_motifs'] += 1
+        motif_stats['total_edges_in_motifs'] += len(edge_from)
         
         # Calculate motif statistics
         motif['num_neighbors'] = len(neighbors)
-        motif['num_edges'] = len(motif['edges'])
-        motif['subgraph_density'] = len(motif['edges']) / max(1, len(neighbors)) if neighbors else 0
+        motif['num_edges'] = len(edge_from)
+        motif['subgraph_density'] = len(edge_from) / max(1, len(neighbors)) if neighbors else 0
         
         motifs.append(motif)
         motif_stats['total_motifs'] += 1
@@ -134,14 +171,53 @@ def extract_subgraph_motifs(adjacency_list):
         'statistics': motif_stats
     }
 
+def motif_to_json(motif):
+    """Convert a motif's edge arrays into the edge-dict layout used on disk."""
+    edges = [
+        {
+            'from': edge_from,
+            'to': edge_to,
+            'weight': weight,
+            'edge_type': EDGE_TYPES[edge_type]
+        }
+        for edge_from, edge_to, weight, edge_type in zip(
+            motif['edge_from'].tolist(),
+            motif['edge_to'].tolist(),
+            motif['edge_weight'].tolist(),
+            motif['edge_type'].tolist()
+        )
+    ]
+    return {
+        'motif_id': motif['motif_id'],
+        'source_node': motif['source_node'],
+        'neighbors': motif['neighbors'],
+        'edges': edges,
+        'num_neighbors': motif['num_neighbors'],
+        'num_edges': motif['num_edges'],
+        'subgraph_density': motif['subgraph_density']
+    }
+
 def save_motifs_to_json(motifs_data, output_path):
-    """Save extracted motifs to JSON file."""
+    """
+    Save extracted motifs to JSON file.
+    
+    Motifs are encoded and written one at a time in compact form, so the
+    whole document is never held as a single serialized buffer.
+    """
     try:
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            json.dump(motifs_data, f, indent=2)
+        with open(output_path, 'wb') as f:
+            f.write(b'{"motifs":[')
+            for i, motif in enumerate(motifs_data['motifs']):
+                if i:
+                    f.write(b',')
+                f.write(orjson.dumps(motif_to_json(motif)))
+            f.write(b'],"statistics":')
+            # motif_size_distribution is keyed by int neighbor counts
+            f.write(orjson.dumps(motifs_data['statistics'], option=orjson.OPT_NON_STR_KEYS))
+            f.write(b'}')
         
         print(f"Motifs successfully saved to {output_path}")
         return True
@@ -165,12 +241,12 @@ def main():
     
     # Build adjacency list
     print("Building adjacency list...")
-    adjacency_list = build_adjacency_list(edges)
-    print(f"Graph has {len(adjacency_list)} unique nodes")
+    node_ids, indptr, indices, weights = build_adjacency_list(*edges)
+    print(f"Graph has {len(node_ids)} unique nodes")
     
     # Extract motifs
     print("Extracting subgraph motifs...")
-    motifs_data = extract_subgraph_motifs(adjacency_list)
+    motifs_data = extract_subgraph_motifs(node_ids, indptr, indices, weights)
     
     # Print statistics
     stats = motifs_data['statistics']
@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for the motif compression server.
+
+Usage:
+    gunicorn -c gunicorn.conf.py server:app
+
+Every endpoint is CPU-bound numpy/scipy/NetworkX work, so requests are
+spread across one sync worker process per core. The app is preloaded in
+the master so the graph, distance data and linkage dendrogram are built
+once and shared copy-on-write by all workers.
+"""
+
+import multiprocessing
+
+# Same address the Flask development server uses, which the frontend calls
+bind = "127.0.0.1:5000"
+
+workers = multiprocessing.cpu_count()
+worker_class = "sync"
+threads = 1
+
+# Load server.py once before forking instead of once per worker
+preload_app = True
@@ -1,34 +1,11 @@
-import json
 from collections import defaultdict
 
+import orjson
+
 def load_mst_data(filename):
     """Load MST data from JSON file"""
-    with open(filename, 'r') as f:
-        return json.load(f)
-
-
-
-def find_path_bfs(graph, start, end):
-    """Find path between two nodes using BFS"""
-    if start == end:
-        return [start]
-    
-    visited = set()
-    queue = [(start, [start])]
-    
-    while queue:
-        node, path = queue.pop(0)
-        if node in visited:
-            continue
-        visited.add(node)
-        
-        for neighbor in graph.get(node, []):
-            if neighbor == end:
-                return path + [neighbor]
-            if neighbor not in visited:
-                queue.append((neighbor, path + [neighbor]))
-    
-    return None
+    with open(filename, 'rb') as f:
+        return orjson.loads(f.read())
 
 
 
@@ -72,48 +49,125 @@ def compute_single_motif_persistence(motif_id, motif_data):
     
     return persistence_points + cycle_points
 
-def compute_single_motif_cycles(motif_data):
-    """Compute 1-dimensional persistence (cycles) for a single motif"""
-    cycle_points = []
+def build_mst_structures(motif_data):
+    """
+    Build the rooted-tree tables used to answer MST path queries
     
+    Each tree of the MST (the source node's first) is rooted once and
+    binary-lifting tables are built over it, so every excluded edge of the
+    motif can reuse them.
+    
+    Args:
+        motif_data: MST data containing source_node and mst_edges
+        
+    Returns:
+        tuple: (index, tree_id, depth, up, max_up) where index maps node IDs
+        to positions, up[k][i] is the 2^k-th ancestor of i and max_up[k][i]
+        the maximum edge weight on the way there; None if there are no edges
+    """
     # Build MST graph as adjacency list
     mst_graph = defaultdict(list)
-    edge_weights = {}
     
     for edge in motif_data['mst_edges']:
         from_node, to_node, weight = edge['from'], edge['to'], edge['weight']
-        mst_graph[from_node].append(to_node)
-        mst_graph[to_node].append(from_node)
-        edge_weights[(min(from_node, to_node), max(from_node, to_node))] = weight
+        mst_graph[from_node].append((to_node, weight))
+        mst_graph[to_node].append((from_node, weight))
+    
+    if not mst_graph:
+        return None
+    
+    # Record parent, depth and the weight of the edge to the parent
+    index = {node: i for i, node in enumerate(mst_graph)}
+    num_nodes = len(index)
+    parent = list(range(num_nodes))
+    parent_weight = [float('-inf')] * num_nodes
+    depth = [0] * num_nodes
+    tree_id = [-1] * num_nodes
+    
+    roots = [motif_data['source_node']] if motif_data['source_node'] in index else []
+    for root in roots + list(mst_graph):
+        if tree_id[index[root]] != -1:
+            continue
+        tree_id[index[root]] = index[root]
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            i = index[node]
+            for neighbor, weight in mst_graph[node]:
+                j = index[neighbor]
+                if tree_id[j] == -1:
+                    tree_id[j] = tree_id[i]
+                    parent[j] = i
+                    parent_weight[j] = weight
+                    depth[j] = depth[i] + 1
+                    stack.append(neighbor)
+    
+    up = [parent]
+    max_up = [parent_weight]
+    for k in range(1, max(1, num_nodes.bit_length())):
+        prev_up, prev_max = up[k - 1], max_up[k - 1]
+        up.append([prev_up[prev_up[i]] for i in range(num_nodes)])
+        max_up.append([max(prev_max[i], prev_max[prev_up[i]]) for i in range(num_nodes)])
+    
+    return index, tree_id, depth, up, max_up
+
+def max_weight_on_path(depth, up, max_up, u, v):
+    """Maximum edge weight on the MST path between node indices u and v"""
+    best = float('-inf')
+    if depth[u] < depth[v]:
+        u, v = v, u
+    diff = depth[u] - depth[v]
+    k = 0
+    while diff:
+        if diff & 1:
+            best = max(best, max_up[k][u])
+            u = up[k][u]
+        diff >>= 1
+        k += 1
+    if u == v:
+        return best
+    for k in range(len(up) - 1, -1, -1):
+        if up[k][u] != up[k][v]:
+            best = max(best, max_up[k][u], max_up[k][v])
+            u, v = up[k][u], up[k][v]
+    return max(best, max_up[0][u], max_up[0][v])
+
+def compute_single_motif_cycles(motif_data):
+    """
+    Compute 1-dimensional persistence (cycles) for a single motif
+    
+    The birth time of the cycle closed by an excluded edge is the maximum
+    weight on the MST path between its endpoints. The tree tables from
+    build_mst_structures are built once per motif and shared by all of its
+    excluded edges, each answered in O(log V).
+    """
+    cycle_points = []
+    
+    structures = build_mst_structures(motif_data)
+    if structures is None:
+        return cycle_points
+    index, tree_id, depth, up, max_up = structures
     
     # For each excluded edge, it would create a cycle
     for edge in motif_data['excluded_edges']:
         from_node, to_node, weight = edge['from'], edge['to'], edge['weight']
         
-        if from_node in mst_graph and to_node in mst_graph:
-            # Find path between nodes in MST
-            path = find_path_bfs(mst_graph, from_node, to_node)
+        if from_node in index and to_node in index and from_node != to_node:
+            u, v = index[from_node], index[to_node]
+            if tree_id[u] != tree_id[v]:
+                continue
+            
+            # Birth time is when the cycle could first form (max weight in MST path)
+            birth_time = max_weight_on_path(depth, up, max_up, u, v)
+            death_time = weight  # Death time is when we add the excluded edge
             
-            if path and len(path) > 1:
-                # Get weights of edges in the path
-                path_weights = []
-                for i in range(len(path) - 1):
-                    edge_key = (min(path[i], path[i+1]), max(path[i], path[i+1]))
-                    if edge_key in edge_weights:
-                        path_weights.append(edge_weights[edge_key])
-                
-                if path_weights:
-                    # Birth time is when the cycle could first form (max weight in MST path)
-                    birth_time = max(path_weights)
-                    death_time = weight  # Death time is when we add the excluded edge
-                    
-                    if death_time > birth_time:
-                        cycle_points.append({
-                            'birth': birth_time,
-                            'death': death_time,
-                            'dimension': 1,  # 1-dimensional (cycles)
-                            'persistence': death_time - birth_time
-                        })
+            if death_time > birth_time:
+                cycle_points.append({
+                    'birth': birth_time,
+                    'death': death_time,
+                    'dimension': 1,  # 1-dimensional (cycles)
+                    'persistence': death_time - birth_time
+                })
     
     return cycle_points
 
@@ -182,8 +236,8 @@ def generate_persistence_coordinates(mst_filename):
     
     # Save coordinates to JSON
     output_filename = 'data/persistence_coordinates.json'
-    with open(output_filename, 'w') as f:
-        json.dump(coordinates, f, indent=2)
+    with open(output_filename, 'wb') as f:
+        f.write(orjson.dumps(coordinates, option=orjson.OPT_INDENT_2))
     
     print(f"Generated persistence data for {len(mst_data)} motifs")
     print(f"Total persistence points: {total_points}")
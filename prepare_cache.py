@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Convert wasserstein_distances.json into a binary cache for the server.
+
+The JSON maps "node1-node2" keys to distances, so every server start has to
+parse ~120k keys into Python strings and floats before it can build the
+distance matrix. This writes the pairs once as three flat .npy arrays
+(node1, node2, distance) that server.py memory-maps on later starts.
+
+Usage:
+    python prepare_cache.py
+
+Re-run after regenerating wasserstein_distances.json; a cache older than the
+JSON is ignored and the server falls back to parsing the JSON.
+"""
+
+import os
+
+import numpy as np
+import orjson
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WASSERSTEIN_PATH = os.path.join(BASE_DIR, "wasserstein_distances.json")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_FILES = {
+    name: os.path.join(CACHE_DIR, f"wasserstein_{name}.npy")
+    for name in ("n1", "n2", "dist")
+}
+
+def parse_wasserstein_pairs(wasserstein_data):
+    """
+    Parse the "node1-node2": distance mapping into flat arrays.
+
+    Args:
+        wasserstein_data: Dict loaded from wasserstein_distances.json
+
+    Returns:
+        tuple: (n1, n2, dist) arrays, one entry per pair in file order
+    """
+    # Parse every "node1-node2" key once into integer arrays
+    pair_keys = [pair.split("-") for pair in wasserstein_data]
+    n1 = np.fromiter((int(k[0]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+    n2 = np.fromiter((int(k[1]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+    dist = np.fromiter(wasserstein_data.values(), dtype=np.float64, count=len(pair_keys))
+
+    return n1, n2, dist
+
+def read_wasserstein_json(path=WASSERSTEIN_PATH):
+    """Load and parse the distance JSON into (n1, n2, dist) arrays."""
+    with open(path, 'rb') as f:
+        return parse_wasserstein_pairs(orjson.loads(f.read()))
+
+def cache_is_fresh(path=WASSERSTEIN_PATH, cache_files=None):
+    """
+    True if every cache file exists and is at least as new as its source.
+
+    Args:
+        path: Source file the cache is derived from
+        cache_files: Cache file paths to check (default: the distance cache)
+    """
+    if cache_files is None:
+        cache_files = CACHE_FILES.values()
+    cache_files = list(cache_files)
+    if not all(os.path.exists(cache_file) for cache_file in cache_files):
+        return False
+    source_mtime = os.path.getmtime(path)
+    return all(os.path.getmtime(cache_file) >= source_mtime for cache_file in cache_files)
+
+def load_wasserstein_pairs(path=WASSERSTEIN_PATH):
+    """
+    Load the distance pairs, from the binary cache when it is up to date.
+
+    Returns:
+        tuple: (n1, n2, dist) arrays - read-only memory maps when the cache
+        is used, otherwise freshly parsed from the JSON
+    """
+    if cache_is_fresh(path):
+        return tuple(np.load(CACHE_FILES[name], mmap_mode='r') for name in ("n1", "n2", "dist"))
+    return read_wasserstein_json(path)
+
+def write_cache(path=WASSERSTEIN_PATH):
+    """Parse the distance JSON and save it as .npy arrays in CACHE_DIR."""
+    n1, n2, dist = read_wasserstein_json(path)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for name, array in (("n1", n1), ("n2", n2), ("dist", dist)):
+        np.save(CACHE_FILES[name], array)
+
+    print(f"Cached {len(dist)} distance pairs to {CACHE_DIR}")
+
+if __name__ == "__main__":
+    write_cache()
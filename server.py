@@ -7,23 +7,44 @@ The server performs agglomerative clustering to group structurally similar
 subgraphs (motifs) and provides various endpoints for visualization and analysis.
 
 Key Features:
-- Threshold-based compression using agglomerative clustering
+- Threshold-based compression using agglomerative clustering (SciPy average
+  linkage, computed once and cut per threshold)
 - Motif expansion and subgraph extraction
 - Compression statistics and unique motif identification
 - Real-time clustering based on precomputed Wasserstein distances
 """
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Flask, request
 import pandas as pd
 import networkx as nx
-import json
 import os
+import warnings
+from collections import namedtuple
+from functools import lru_cache
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+import orjson
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from prepare_cache import load_wasserstein_pairs
+
+# networkx >= 3.5 warns on every Weisfeiler-Lehman hash of an unattributed
+# graph that the hash values changed; /unique_motifs only compares hashes
+# within one process, so the notice is just log noise
+warnings.filterwarnings(
+    'ignore',
+    message='The hashes produced for graphs without node or edge attributes',
+    category=UserWarning
+)
 
 app = Flask(__name__)
-CORS(app)  # Enable cross-origin requests for frontend integration
+# Enable cross-origin requests for frontend integration. Behind a reverse
+# proxy that adds the CORS headers itself (see README), set ENABLE_CORS=0 to
+# skip the per-response flask_cors middleware (flask_cors is then not needed)
+if os.environ.get("ENABLE_CORS", "1") == "1":
+    from flask_cors import CORS
+    CORS(app)
 
 # File paths for data loading - using absolute paths to ensure files are found
 # regardless of where the script is executed from
@@ -32,82 +53,293 @@ CSV_PATH = os.path.join(BASE_DIR, "facebook_weighted_filtered.csv")
 WASSERSTEIN_PATH = os.path.join(BASE_DIR, "wasserstein_distances.json")
 MOTIF_PATH = os.path.join(BASE_DIR, "facebook_motifs.json")
 
+# Whether /motif expands to the node's whole cluster when the request doesn't
+# say (the frontend's click-to-expand expects nodes + adjacency_matrix).
+# Set FULL_CLUSTER_EXPANSION=0 to default to the precomputed motif data.
+FULL_CLUSTER_EXPANSION = os.environ.get("FULL_CLUSTER_EXPANSION", "1") == "1"
+
 # Load the main graph from CSV data
 # Expected format: source_node, target_node, edge_weight
 # Using NetworkX Graph (undirected) since social networks are typically bidirectional
 df = pd.read_csv(CSV_PATH)
 G = nx.Graph()
-for _, row in df.iterrows():
-    # Convert to int/float to ensure proper data types for graph algorithms
-    G.add_edge(int(row[0]), int(row[1]), weight=float(row[2]))
+# Pull the columns out as native ints/floats in one pass and bulk-add them,
+# rather than boxing every row into a Series
+edges = df.to_numpy()
+G.add_weighted_edges_from(zip(
+    edges[:, 0].astype(np.int64).tolist(),
+    edges[:, 1].astype(np.int64).tolist(),
+    edges[:, 2].astype(np.float64).tolist()
+))
+# The graph is static once loaded; freezing it makes any accidental
+# mutation from a request handler raise instead of corrupting shared state
+nx.freeze(G)
+
+# G's edges as flat arrays (in G.edges() order), read in a single pass, so
+# per-request edge aggregation and connectivity never walk NetworkX's
+# adjacency dicts
+edge_columns = list(zip(*G.edges(data='weight'))) or [(), (), ()]
+edges_u = np.array(edge_columns[0], dtype=np.int64)
+edges_v = np.array(edge_columns[1], dtype=np.int64)
+edges_w = np.array(edge_columns[2], dtype=np.float64)
+
+# Weighted sparse adjacency of G with a fixed node order, built once so each
+# cluster's adjacency matrix is a CSR slice instead of a NetworkX edge walk
+graph_nodes = list(G.nodes())
+graph_row = {node: i for i, node in enumerate(graph_nodes)}  # node_id -> adjacency row
+adjacency = nx.to_scipy_sparse_array(G, nodelist=graph_nodes, weight='weight', format='csr')
 
 # Load precomputed data files
-# wasserstein_data: pairwise Wasserstein distances between motifs (format: "node1-node2": distance)
+# pair_n1/pair_n2/pair_dist: pairwise Wasserstein distances between motifs, one
+# entry per "node1-node2" pair - memory-mapped from the binary cache written
+# by prepare_cache.py, or parsed from the JSON if the cache is missing/stale
 # motif_data: individual motif structures for each node
-with open(WASSERSTEIN_PATH, 'r') as f:
-    wasserstein_data = json.load(f)
-with open(MOTIF_PATH, 'r') as f:
-    motif_data = json.load(f)
+pair_n1, pair_n2, pair_dist = load_wasserstein_pairs(WASSERSTEIN_PATH)
+with open(MOTIF_PATH, 'rb') as f:
+    motif_data = orjson.loads(f.read())
 
 # Build node indexing system for clustering algorithms
 # Extract all unique nodes from the Wasserstein distance pairs
-all_nodes = sorted(set(int(k.split("-")[0]) for k in wasserstein_data.keys()) |
-                   set(int(k.split("-")[1]) for k in wasserstein_data.keys()))
+all_nodes = np.unique(np.concatenate([pair_n1, pair_n2])).tolist()
 node_index = {node: i for i, node in enumerate(all_nodes)}  # node_id -> matrix_index
-index_node = {i: node for node, i in node_index.items()}    # matrix_index -> node_id
+node_ids = np.asarray(all_nodes)                            # matrix_index -> node_id
 
-# Build symmetric distance matrix for agglomerative clustering
-# Uses precomputed Wasserstein distances between motif structures
+# Build condensed distance matrix for agglomerative clustering
+# Uses precomputed Wasserstein distances between motif structures. Only the
+# upper triangle (i < j) is stored, in the row-major order scipy's linkage
+# consumes - half the size of the symmetric N x N matrix
 N = len(all_nodes)
 # Initialize with large distances (100.0) to handle missing pairs - this ensures
-# nodes without precomputed distances are treated as maximally dissimilar
-dist_matrix = np.full((N, N), fill_value=100.0)
-for pair, dist in wasserstein_data.items():
-    n1, n2 = map(int, pair.split("-"))
-    i, j = node_index[n1], node_index[n2]
-    # Ensure symmetry since Wasserstein distance is symmetric but may only be
-    # stored in one direction in the JSON file
-    dist_matrix[i][j] = dist
-    dist_matrix[j][i] = dist
-np.fill_diagonal(dist_matrix, 0.0)  # Distance from node to itself is always 0
+# nodes without precomputed distances are treated as maximally dissimilar.
+# Kept as float64: linkage computes in double regardless, and rounding the
+# distances to float32 reorders merges between near-tied motifs, which
+# changes the clusters the frontend sees at many thresholds
+dist_condensed = np.full(N * (N - 1) // 2, fill_value=100.0, dtype=np.float64)
+# Map node IDs to matrix indices through a lookup array, then store every
+# pair with one fancy-indexed assignment
+# Largest node ID in either the graph or the distance data, for sizing
+# node ID lookup arrays
+max_node_id = max(max(all_nodes), int(edges_u.max(initial=0)), int(edges_v.max(initial=0)))
+index_lookup = np.full(max_node_id + 1, -1, dtype=np.int64)
+index_lookup[all_nodes] = np.arange(N)
+i = index_lookup[pair_n1]
+j = index_lookup[pair_n2]
+# Wasserstein distance is symmetric and pairs may be stored in either
+# direction, so order each pair as i < j; a node's distance to itself is
+# always 0 and has no slot
+off_diagonal = i != j
+i, j = np.minimum(i, j)[off_diagonal], np.maximum(i, j)[off_diagonal]
+dist_condensed[N * i - i * (i + 1) // 2 + (j - i - 1)] = pair_dist[off_diagonal]
+
+# Average-linkage dendrogram, built once at startup; it encodes the
+# clustering for every threshold, so each request only has to cut it
+linkage_matrix = linkage(dist_condensed, method='average')
+# Lowest merge height; no threshold at or below it merges anything
+min_merge_height = linkage_matrix[:, 2].min()
+
+# G's edges between clustered nodes, as matrix indices, for splitting
+# clusters into connected components
+edge_i = index_lookup[edges_u]
+edge_j = index_lookup[edges_v]
+clustered_edge = (edge_i >= 0) & (edge_j >= 0)
+edge_i, edge_j = edge_i[clustered_edge], edge_j[clustered_edge]
 
 def build_connected_clusters(labels):
     """
-    Build cluster mapping ensuring each cluster is a connected component.
+    Group nodes into clusters, ensuring each cluster is a connected component.
     
     Takes clustering labels and splits any disconnected clusters into 
     their connected components to ensure visual coherence.
     
     Args:
-        labels: Array of cluster labels from AgglomerativeClustering
+        labels: Array of cluster labels from the dendrogram cut
         
     Returns:
-        dict: cluster_id -> list of connected node IDs
+        tuple: (members, offsets) in CSR style - the matrix indices of
+        cluster c are members[offsets[c]:offsets[c + 1]], in index order
+    """
+    labels = np.asarray(labels)
+
+    # Keep only the edges inside a cluster; the connected components of
+    # what remains are the connected pieces of each cluster, found in one
+    # pass instead of a BFS per cluster
+    same_cluster = labels[edge_i] == labels[edge_j]
+    intra_cluster = csr_matrix(
+        (np.ones(np.count_nonzero(same_cluster)), (edge_i[same_cluster], edge_j[same_cluster])),
+        shape=(N, N)
+    )
+    _, component = connected_components(intra_cluster, directed=False)
+
+    # Number the pieces in order of their cluster's first appearance, then
+    # of their own first node
+    _, label_first, label_inverse = np.unique(labels, return_index=True, return_inverse=True)
+    _, component_first, component_inverse = np.unique(component, return_index=True, return_inverse=True)
+    component_first = component_first[component_inverse]
+    members = np.lexsort((np.arange(N), component_first, label_first[label_inverse]))
+    offsets = np.concatenate([[0], np.flatnonzero(np.diff(component_first[members])) + 1, [N]])
+
+    return members, offsets
+
+def ojsonify(data):
     """
-    # Build initial cluster mapping
-    initial_cluster_map = {}
-    for idx, label in enumerate(labels):
-        initial_cluster_map.setdefault(label, []).append(index_node[idx])
+    JSON response serialized with orjson.
     
-    # Split disconnected clusters into connected components
-    cluster_map = {}
-    cluster_counter = 0
+    Stands in for flask.jsonify: orjson is several times faster on the large
+    float-heavy link lists and adjacency matrices these endpoints return,
+    and serializes numpy arrays and scalars directly.
+    """
+    return app.response_class(
+        orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+        mimetype='application/json'
+    )
+
+def subgraph_adjacency(nodes):
+    """
+    Weighted adjacency matrix of G restricted to the given nodes.
     
-    for original_cluster_id, nodes in initial_cluster_map.items():
-        if len(nodes) == 1:
-            # Single node clusters are always connected
-            cluster_map[cluster_counter] = nodes
-            cluster_counter += 1
-        else:
-            # Check connectivity and split if necessary
-            subgraph = G.subgraph(nodes)
-            components = list(nx.connected_components(subgraph))
-            
-            for component in components:
-                cluster_map[cluster_counter] = list(component)
-                cluster_counter += 1
+    Args:
+        nodes: Node IDs; their order sets the row/column order
+        
+    Returns:
+        np.ndarray: len(nodes) x len(nodes) matrix, 0 where there is no edge
+    """
+    rows = np.fromiter((graph_row[n] for n in nodes), dtype=np.int64, count=len(nodes))
+    return adjacency[rows][:, rows].toarray()
+
+Clustering = namedtuple('Clustering', ['labels', 'cluster_map', 'node_to_cluster', 'representatives'])
+
+@lru_cache(maxsize=128)
+def _cluster(threshold):
+    """
+    Cluster the motifs at a threshold, memoized across requests.
+    
+    Every endpoint clusters at the threshold the frontend is currently
+    showing, so the dendrogram cut and connectivity split happen once
+    per threshold instead of once per request. Results are read-only
+    (frozen arrays, tuples) so they can be shared between request threads.
     
-    return cluster_map
+    Args:
+        threshold: Distance threshold, already rounded by cluster_for_threshold
+        
+    Returns:
+        Clustering: labels; cluster_map, where cluster_map[cluster_id] is a
+        tuple of connected node IDs; node_to_cluster, an array mapping node
+        IDs to their cluster_id (-1 for nodes that weren't clustered); and
+        representatives, each cluster's smallest node ID
+    """
+    # Cut the average-linkage dendrogram at the threshold. Merge only below
+    # it, matching AgglomerativeClustering's distance_threshold (fcluster
+    # keeps merges at or below t). Labels are 1-based, which
+    # build_connected_clusters doesn't depend on.
+    if threshold <= min_merge_height:
+        # Every node is its own cluster (the frontend's default threshold of
+        # 0 lands here), so skip the cut and the connectivity split
+        labels = np.arange(1, N + 1)
+        members, offsets = np.arange(N), np.arange(N + 1)
+    else:
+        labels = fcluster(linkage_matrix, t=np.nextafter(threshold, -np.inf), criterion='distance')
+
+        # Group nodes by cluster labels and ensure connectivity
+        members, offsets = build_connected_clusters(labels)
+    member_nodes = node_ids[members]
+    sizes = np.diff(offsets)
+
+    cluster_map = tuple(tuple(piece.tolist()) for piece in np.split(member_nodes, offsets[1:-1]))
+
+    # Reverse lookup so finding a node's cluster is an array read, not a scan
+    node_to_cluster = np.full(max_node_id + 1, -1, dtype=np.int64)
+    node_to_cluster[member_nodes] = np.repeat(np.arange(len(sizes)), sizes)
+
+    # Use smallest node ID as representative for consistency across runs
+    representatives = np.minimum.reduceat(member_nodes, offsets[:-1])
+
+    for array in (labels, node_to_cluster, representatives):
+        array.setflags(write=False)
+
+    return Clustering(labels, cluster_map, node_to_cluster, representatives)
+
+def cluster_for_threshold(threshold):
+    """Cached Clustering for a threshold, rounded to 6 decimals for the cache key."""
+    return _cluster(round(threshold, 6))
+
+@lru_cache(maxsize=128)
+def _unique_motifs(threshold):
+    """
+    Group the clusters at a threshold into structurally unique patterns.
+    
+    The VF2 isomorphism tests and WL hashes are pure-Python NetworkX work
+    that holds the GIL, so threads can't spread them over cores (gunicorn
+    worker processes do that across requests). The grouping only depends
+    on the threshold, so it is memoized instead and a repeat request skips
+    the per-cluster work entirely. Results are read-only so they can be
+    shared between request threads.
+    
+    Args:
+        threshold: Distance threshold, already rounded by unique_motifs_for_threshold
+        
+    Returns:
+        tuple: Pattern dicts with nodes, adjacency_matrix, count and all_nodes
+    """
+    cluster_map = _cluster(threshold).cluster_map
+
+    # Find unique structural patterns using graph isomorphism
+    # This identifies clusters that have identical connectivity patterns
+    seen_subgraphs = []  # Track unique patterns found so far
+    # Patterns bucketed by isomorphism-invariant signature; graphs with
+    # different signatures can't be isomorphic, so the expensive VF2 check
+    # only runs against patterns in the same bucket
+    signature_buckets = {}
+
+    for nodes in cluster_map:
+        subgraph = G.subgraph(nodes)
+        matched = None
+
+        signature = (
+            subgraph.number_of_nodes(),
+            subgraph.number_of_edges(),
+            tuple(sorted(d for _, d in subgraph.degree())),
+            nx.weisfeiler_lehman_graph_hash(subgraph)
+        )
+        bucket = signature_buckets.setdefault(signature, [])
+
+        # Check if this subgraph matches any previously seen pattern
+        # Graph isomorphism considers structure but not node labels or positions
+        for motif in bucket:
+            if nx.is_isomorphic(subgraph, motif['graph']):
+                motif['count'] += 1  # Increment count for this pattern
+                motif['all_nodes'].extend(nodes)  # Add nodes to the pattern
+                matched = True
+                break
+
+        if not matched:
+            # New unique pattern found - store both the graph and its matrix representation
+            motif = {
+                'graph': subgraph,  # Keep graph object for isomorphism testing
+                'nodes': list(nodes),  # Representative nodes for visualization layout
+                'all_nodes': list(nodes),  # All nodes with this pattern (grows as matches found)
+                'adjacency_matrix': subgraph_adjacency(nodes),
+                'count': 1
+            }
+            seen_subgraphs.append(motif)
+            bucket.append(motif)
+
+    # Format output for frontend consumption
+    # Remove internal graph objects and prepare data for JSON serialization
+    result = []
+    for motif in seen_subgraphs:
+        motif['adjacency_matrix'].setflags(write=False)
+        result.append({
+            "nodes": tuple(motif['nodes']),  # Representative cluster for D3.js layout
+            "adjacency_matrix": motif['adjacency_matrix'],
+            "count": motif['count'],  # How many clusters share this pattern
+            "all_nodes": tuple(set(motif['all_nodes']))  # Deduplicated complete node list
+        })
+
+    return tuple(result)
+
+def unique_motifs_for_threshold(threshold):
+    """Cached unique motif patterns for a threshold, rounded like cluster_for_threshold."""
+    return _unique_motifs(round(threshold, 6))
 
 @app.route('/processed_edges')
 def get_processed_graph():
@@ -130,54 +362,44 @@ def get_processed_graph():
     """
     threshold = float(request.args.get("threshold", 0))
 
-    # Perform agglomerative clustering based on Wasserstein distances
-    # Using average linkage to balance cluster sizes and avoid chaining effects
-    model = AgglomerativeClustering(
-        metric='precomputed',        # Use our precomputed distance matrix
-        distance_threshold=threshold, # Clustering threshold - lower = more compression
-        n_clusters=None,             # Let threshold determine cluster count automatically
-        linkage='average'            # Average linkage reduces sensitivity to outliers
-    )
-    labels = model.fit_predict(dist_matrix)
-
-    # Group nodes by cluster labels and ensure connectivity
-    cluster_map = build_connected_clusters(labels)
+    # Clusters at this threshold, each split into connected components
+    clustering = cluster_for_threshold(threshold)
 
-    # Create supernodes (cluster representatives) and mapping
+    # Create supernodes (cluster representatives)
     # Each cluster is represented by a single "supernode" for visualization
-    cluster_id_map = {}  # original_node -> (cluster_id, representative_node)
     supernodes = []
-    for cid, members in cluster_map.items():
-        # Use smallest node ID as representative for consistency across runs
-        rep = min(members)
-        for m in members:
-            cluster_id_map[m] = (cid, rep)
+    for cid, (members, rep) in enumerate(zip(clustering.cluster_map, clustering.representatives.tolist())):
         # Store metadata needed for frontend visualization and expansion
         supernodes.append({
-            "id": int(rep),
+            "id": rep,
             "compressed": True,
-            "cluster_id": int(cid),
-            "nodes_in_cluster": [int(n) for n in members]
+            "cluster_id": cid,
+            "nodes_in_cluster": list(members)
         })
 
+    # Map every node ID to its cluster representative (or itself if not clustered)
+    node_to_cluster = clustering.node_to_cluster
+    rep_of = np.where(node_to_cluster >= 0, clustering.representatives[node_to_cluster], np.arange(max_node_id + 1))
+
     # Aggregate edges between clusters - combine multiple edges into single weighted edges
-    edge_dict = {}
-    for u, v, data in G.edges(data=True):
-        # Map nodes to their cluster representatives (or themselves if not clustered)
-        cu, ru = cluster_id_map.get(u, (None, u))
-        cv, rv = cluster_id_map.get(v, (None, v))
-        if ru != rv:  # Only keep inter-cluster edges (remove intra-cluster edges)
-            # Sort edge endpoints to ensure consistent key regardless of direction
-            key = tuple(sorted([ru, rv]))
-            edge_dict.setdefault(key, []).append(data["weight"])
+    ru = rep_of[edges_u]
+    rv = rep_of[edges_v]
+    inter_cluster = ru != rv  # Only keep inter-cluster edges (remove intra-cluster edges)
+    # Sort edge endpoints to ensure consistent key regardless of direction, and
+    # pack each (low, high) pair into one int64 key (node IDs fit in 32 bits)
+    # so grouping hashes a single integer column
+    edge_keys = (np.minimum(ru, rv)[inter_cluster] << 32) | np.maximum(ru, rv)[inter_cluster]
 
     # Create compressed edge list with averaged weights
     # Multiple edges between clusters are combined using mean weight to preserve
-    # overall connectivity strength while simplifying the visualization
-    links = [{"source": int(a), "target": int(b), "weight": float(np.mean(w))} 
-             for (a, b), w in edge_dict.items()]
-
-    return jsonify({"nodes": supernodes, "links": links})
+    # overall connectivity strength while simplifying the visualization.
+    # sort=False keeps links in order of first appearance
+    merged = pd.Series(edges_w[inter_cluster]).groupby(edge_keys, sort=False).mean()
+    keys = merged.index.to_numpy()
+    links = [{"source": a, "target": b, "weight": w}
+             for a, b, w in zip((keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist(), merged.tolist())]
+
+    return ojsonify({"nodes": supernodes, "links": links})
 @app.route('/cluster_subgraph/<int:cluster_id>')
 def get_cluster_subgraph(cluster_id):
     """
@@ -204,28 +426,18 @@ def get_cluster_subgraph(cluster_id):
     threshold = float(request.args.get("threshold", 0))
 
     # Recreate clustering to find the specified cluster
-    model = AgglomerativeClustering(
-        metric='precomputed',
-        distance_threshold=threshold,
-        n_clusters=None,
-        linkage='average'
-    )
-    labels = model.fit_predict(dist_matrix)
+    cluster_map = cluster_for_threshold(threshold).cluster_map
 
-    # Build cluster mapping and ensure connectivity
-    cluster_map = build_connected_clusters(labels)
-
-    if cluster_id not in cluster_map:
-        return jsonify({"error": "Cluster not found"}), 404
+    if cluster_id >= len(cluster_map):
+        return ojsonify({"error": "Cluster not found"}), 404
 
     # Extract subgraph for the requested cluster
-    nodes = cluster_map[cluster_id]
-    subgraph = G.subgraph(nodes)
-    # Convert to adjacency matrix preserving node order and edge weights
-    # Using nodelist parameter ensures consistent matrix ordering for frontend
-    adj_matrix = nx.to_numpy_array(subgraph, nodelist=nodes, weight='weight').tolist()
+    nodes = list(cluster_map[cluster_id])
+    # Slice its adjacency matrix preserving node order and edge weights
+    # Keeping the nodes order ensures consistent matrix ordering for frontend
+    adj_matrix = subgraph_adjacency(nodes)
 
-    return jsonify({
+    return ojsonify({
         "nodes": nodes,
         "adjacency_matrix": adj_matrix
     })
@@ -245,7 +457,8 @@ def get_motif(node_id):
         
     Query Parameters:
         full_cluster (bool): If "true", return entire cluster containing this node
-                           If "false", return individual motif data (default)
+                           If "false", return individual motif data
+                           (default: FULL_CLUSTER_EXPANSION, normally "true")
         threshold (float): Distance threshold for clustering (used with full_cluster)
     
     Returns:
@@ -259,35 +472,21 @@ def get_motif(node_id):
     Error Responses:
         404: Motif not found in precomputed data
     """
-    full_cluster = request.args.get("full_cluster", "false").lower() == "true"
+    full_cluster = request.args.get("full_cluster", str(FULL_CLUSTER_EXPANSION)).lower() == "true"
     threshold = float(request.args.get("threshold", 0))
 
     if full_cluster:
         # Return the entire cluster containing this node
-        model = AgglomerativeClustering(
-            metric='precomputed',
-            distance_threshold=threshold,
-            n_clusters=None,
-            linkage='average'
-        )
-        labels = model.fit_predict(dist_matrix)
-
-        cluster_map = build_connected_clusters(labels)
+        clustering = cluster_for_threshold(threshold)
 
         # Find which cluster contains the requested node
-        # Linear search through clusters - could be optimized with reverse mapping
-        # but cluster count is typically small so performance impact is minimal
-        cluster_nodes = []
-        for group in cluster_map.values():
-            if node_id in group:
-                cluster_nodes = group
-                break
+        cid = int(clustering.node_to_cluster[node_id]) if node_id <= max_node_id else -1
+        cluster_nodes = list(clustering.cluster_map[cid]) if cid >= 0 else []
 
-        # Extract the cluster's subgraph and adjacency matrix
-        subgraph = G.subgraph(cluster_nodes)
-        adj_matrix = nx.to_numpy_array(subgraph, nodelist=cluster_nodes, weight='weight').tolist()
+        # Extract the cluster's adjacency matrix
+        adj_matrix = subgraph_adjacency(cluster_nodes)
 
-        return jsonify({
+        return ojsonify({
             "nodes": cluster_nodes,
             "adjacency_matrix": adj_matrix
         })
@@ -295,8 +494,8 @@ def get_motif(node_id):
         # Return individual motif data from precomputed file
         data = motif_data.get(str(node_id))
         if not data:
-            return jsonify({"error": "Motif not found"}), 404
-        return jsonify(data)
+            return ojsonify({"error": "Motif not found"}), 404
+        return ojsonify(data)
 @app.route('/unique_motifs')
 def get_unique_motifs():
     """
@@ -320,56 +519,10 @@ def get_unique_motifs():
     """
     threshold = float(request.args.get("threshold", 0))
 
-    # Perform clustering to get cluster groups
-    model = AgglomerativeClustering(
-        metric='precomputed',
-        distance_threshold=threshold,
-        n_clusters=None,
-        linkage='average'
-    )
-    labels = model.fit_predict(dist_matrix)
-
-    cluster_map = build_connected_clusters(labels)
+    # Unique patterns are memoized per threshold like the clustering itself
+    result = unique_motifs_for_threshold(threshold)
 
-    # Find unique structural patterns using graph isomorphism
-    # This identifies clusters that have identical connectivity patterns
-    seen_subgraphs = []  # Track unique patterns found so far
-
-    for nodes in cluster_map.values():
-        subgraph = G.subgraph(nodes)
-        matched = None
-
-        # Check if this subgraph matches any previously seen pattern
-        # Graph isomorphism considers structure but not node labels or positions
-        for motif in seen_subgraphs:
-            if nx.is_isomorphic(subgraph, motif['graph']):
-                motif['count'] += 1  # Increment count for this pattern
-                motif['all_nodes'].extend(nodes)  # Add nodes to the pattern
-                matched = True
-                break
-
-        if not matched:
-            # New unique pattern found - store both the graph and its matrix representation
-            seen_subgraphs.append({
-                'graph': subgraph,  # Keep graph object for isomorphism testing
-                'nodes': list(nodes),  # Representative nodes for visualization layout
-                'all_nodes': list(nodes),  # All nodes with this pattern (grows as matches found)
-                'adjacency_matrix': nx.to_numpy_array(subgraph, nodelist=nodes, weight='weight').tolist(),
-                'count': 1
-            })
-
-    # Format output for frontend consumption
-    # Remove internal graph objects and prepare data for JSON serialization
-    result = []
-    for motif in seen_subgraphs:
-        result.append({
-            "nodes": motif['nodes'],  # Representative cluster for D3.js layout
-            "adjacency_matrix": motif['adjacency_matrix'],
-            "count": motif['count'],  # How many clusters share this pattern
-            "all_nodes": list(set(motif['all_nodes']))  # Deduplicated complete node list
-        })
-
-    return jsonify(result)
+    return ojsonify(result)
 @app.route('/compression_stats')
 def compression_stats():
     """
@@ -391,13 +544,7 @@ def compression_stats():
     threshold = float(request.args.get("threshold", 0))
 
     # Perform clustering to calculate compression metrics
-    model = AgglomerativeClustering(
-        metric='precomputed',
-        distance_threshold=threshold,
-        n_clusters=None,
-        linkage='average'
-    )
-    labels = model.fit_predict(dist_matrix)
+    labels = cluster_for_threshold(threshold).labels
 
     # Calculate compression statistics
     num_original = len(labels)  # Original number of motifs/nodes
@@ -405,7 +552,7 @@ def compression_stats():
     # Compression percentage: how much the graph was reduced (0% = no compression, 100% = maximum)
     compression = round((1 - num_clusters / num_original) * 100, 1)
 
-    return jsonify({
+    return ojsonify({
         "original_motifs": num_original,
         "supernodes": num_clusters,
         "compression_percent": compression
@@ -413,7 +560,10 @@ def compression_stats():
 
 
 if __name__ == '__main__':
-    # Run Flask development server with debug mode enabled
+    # Run Flask development server for local use (threaded, as is Flask's
+    # default since 1.0; threaded=True only spells it out); set DEBUG=1 for the
+    # reloader and debugger. In production run it under gunicorn instead:
+    #     gunicorn -c gunicorn.conf.py server:app
     # Server will be available at http://127.0.0.1:5000
-    app.run(debug=True)
+    app.run(debug=os.environ.get("DEBUG") == "1", threaded=True)
     
@@ -2,102 +2,332 @@
 """
 Test the connectivity fix
 """
-import json
+import contextlib
+import functools
+import io
+import multiprocessing as mp
+import os
+import pickle
+import sys
 import numpy as np
+import orjson
 import networkx as nx
 import pandas as pd
-from sklearn.cluster import AgglomerativeClustering
-
-# Load data (same as server.py)
-df = pd.read_csv("facebook_weighted_filtered.csv")
-G = nx.Graph()
-for _, row in df.iterrows():
-    G.add_edge(int(row[0]), int(row[1]), weight=float(row[2]))
-
-with open('wasserstein_distances.json', 'r') as f:
-    wasserstein_data = json.load(f)
-
-# Build distance matrix (same as server.py)
-all_nodes = sorted(set(int(k.split("-")[0]) for k in wasserstein_data.keys()) |
-                   set(int(k.split("-")[1]) for k in wasserstein_data.keys()))
-node_index = {node: i for i, node in enumerate(all_nodes)}
-index_node = {i: node for node, i in node_index.items()}
-
-N = len(all_nodes)
-dist_matrix = np.full((N, N), fill_value=100.0)
-for pair, dist in wasserstein_data.items():
-    n1, n2 = map(int, pair.split("-"))
-    i, j = node_index[n1], node_index[n2]
-    dist_matrix[i][j] = dist
-    dist_matrix[j][i] = dist
-np.fill_diagonal(dist_matrix, 0.0)
-
-def build_connected_clusters(labels):
-    """Build cluster mapping ensuring each cluster is connected"""
-    # Build initial cluster mapping
-    initial_cluster_map = {}
-    for idx, label in enumerate(labels):
-        initial_cluster_map.setdefault(label, []).append(index_node[idx])
-    
-    # Split disconnected clusters into connected components
-    cluster_map = {}
-    cluster_counter = 0
-    
-    for original_cluster_id, nodes in initial_cluster_map.items():
-        if len(nodes) == 1:
-            cluster_map[cluster_counter] = nodes
-            cluster_counter += 1
-        else:
-            subgraph = G.subgraph(nodes)
-            components = list(nx.connected_components(subgraph))
-            
-            for component in components:
-                cluster_map[cluster_counter] = list(component)
-                cluster_counter += 1
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial.distance import squareform
+
+from prepare_cache import CACHE_DIR, WASSERSTEIN_PATH, cache_is_fresh
+
+# Anchor data and cache paths to this file, like server.py, so running from
+# another directory neither misses the data nor scatters cache files
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EDGES_PATH = os.path.join(BASE_DIR, "facebook_weighted_filtered.csv")
+GRAPH_CACHE = os.path.join(CACHE_DIR, 'test_fix_graph.pkl')
+NODES_CACHE = os.path.join(CACHE_DIR, 'test_fix_nodes.npy')
+DIST_CACHE = os.path.join(CACHE_DIR, 'test_fix_dist_matrix.npy')
+
+def build_graph():
+    """Load the weighted edge list into G (same as server.py)."""
+    df = pd.read_csv(EDGES_PATH)
+    # Build G straight from the columns instead of one Series per row; the
+    # integer-valued weights are exact in float32
+    df[df.columns[2]] = df[df.columns[2]].astype(np.float32)
+    return nx.from_pandas_edgelist(
+        df.rename(columns={df.columns[2]: 'weight'}),
+        source=df.columns[0],
+        target=df.columns[1],
+        edge_attr='weight'
+    )
+
+def build_dist_matrix():
+    """
+    Parse the distance JSON into the dense matrix (same as server.py)
+
+    Returns:
+        tuple: (node_ids, dist_matrix) - sorted clustered node IDs and the
+        N x N distances between them in that order
+    """
+    with open(WASSERSTEIN_PATH, 'rb') as f:
+        wasserstein_data = orjson.loads(f.read())
+
+    # Parse every "n1-n2" key once into integer arrays
+    pair_keys = [pair.split("-") for pair in wasserstein_data]
+    pair_n1 = np.fromiter((int(k[0]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+    pair_n2 = np.fromiter((int(k[1]) for k in pair_keys), dtype=np.int64, count=len(pair_keys))
+    pair_dist = np.fromiter(wasserstein_data.values(), dtype=np.float64, count=len(pair_keys))
+
+    node_ids = np.unique(np.concatenate([pair_n1, pair_n2]))
+    N = len(node_ids)
+    # Map node IDs to matrix indices through a lookup array and fill both
+    # triangles with one fancy-indexed assignment each
+    index_lookup = np.full(node_ids[-1] + 1, -1, dtype=np.int64)
+    index_lookup[node_ids] = np.arange(N)
+    i = index_lookup[pair_n1]
+    j = index_lookup[pair_n2]
+    # float64 like server.py: float32 rounding reorders average-linkage merges
+    # between near-tied motifs and would test different clusters than it serves
+    dist_matrix = np.full((N, N), fill_value=100.0, dtype=np.float64)
+    dist_matrix[i, j] = pair_dist
+    dist_matrix[j, i] = pair_dist
+    np.fill_diagonal(dist_matrix, 0.0)
+    return node_ids, dist_matrix
+
+# Loaded data, filled in by load_data() on first use
+G = None
+node_ids = None
+dist_matrix = None
+N = 0
+index_lookup = None
+edge_i = None
+edge_j = None
+
+def load_data():
+    """
+    Load G, the clustered node IDs and the distance matrix into the module
+    globals, along with the index maps and clustered edge arrays built
+    from them. Does nothing once loaded.
+    """
+    global G, node_ids, dist_matrix, N, index_lookup, edge_i, edge_j
+    if G is not None:
+        return
     
-    return cluster_map
-
-def test_connectivity_fix(threshold=0.1):
-    """Test that all clusters are now connected"""
-    model = AgglomerativeClustering(
-        metric='precomputed',
-        distance_threshold=threshold,
-        n_clusters=None,
-        linkage='average'
+    # Rebuild G and the distance matrix only when their sources changed;
+    # later runs unpickle G and memory-map the matrix instead of re-parsing
+    # the CSV and JSON, and the OS page cache holds the only copy of the matrix
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if cache_is_fresh(EDGES_PATH, [GRAPH_CACHE]):
+        with open(GRAPH_CACHE, 'rb') as f:
+            G = pickle.load(f)
+    else:
+        G = build_graph()
+        with open(GRAPH_CACHE, 'wb') as f:
+            pickle.dump(G, f, protocol=5)
+
+    if cache_is_fresh(WASSERSTEIN_PATH, [NODES_CACHE, DIST_CACHE]):
+        node_ids = np.load(NODES_CACHE)
+    else:
+        node_ids, full_matrix = build_dist_matrix()
+        np.save(NODES_CACHE, node_ids)
+        np.save(DIST_CACHE, full_matrix)
+        del full_matrix
+    dist_matrix = np.load(DIST_CACHE, mmap_mode='r')
+
+    # Node ID <-> matrix index maps as arrays: node_ids[idx] is the node at a
+    # matrix index, index_lookup[node] its index (-1 when not clustered)
+    N = len(node_ids)
+    edge_u, edge_v = (np.fromiter(col, dtype=np.int64, count=G.number_of_edges()) for col in zip(*G.edges()))
+    max_node_id = max(int(node_ids[-1]), int(edge_u.max(initial=0)), int(edge_v.max(initial=0)))
+    index_lookup = np.full(max_node_id + 1, -1, dtype=np.int64)
+    index_lookup[node_ids] = np.arange(N)
+
+    # G's edges between clustered nodes, as matrix indices, for the CSR splits
+    edge_i = index_lookup[edge_u]
+    edge_j = index_lookup[edge_v]
+    clustered_edge = (edge_i >= 0) & (edge_j >= 0)
+    edge_i, edge_j = edge_i[clustered_edge], edge_j[clustered_edge]
+    # Sort the edges by row once so every split can slice a CSR matrix out of
+    # them directly instead of re-sorting a COO matrix per threshold
+    edge_order = np.lexsort((edge_j, edge_i))
+    edge_i, edge_j = edge_i[edge_order], edge_j[edge_order]
+
+def split_labels(labels):
+    """
+    Label each node with its connected piece of its cluster
+
+    Args:
+        labels: Cluster label per matrix index
+
+    Returns:
+        np.ndarray: Component id per matrix index; two nodes share an id
+        only if they share a cluster and are connected inside it
+    """
+    # Keep only intra-cluster edges and let csgraph's compiled search find
+    # every cluster's pieces at once (as server.py does)
+    labels = np.asarray(labels)
+    same_cluster = labels[edge_i] == labels[edge_j]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(edge_i[same_cluster], minlength=N))])
+    intra_cluster = csr_matrix(
+        (np.ones(indptr[-1]), edge_j[same_cluster], indptr),
+        shape=(N, N)
     )
-    labels = model.fit_predict(dist_matrix)
+    _, components = connected_components(intra_cluster, directed=False)
+    return components
+
+def group_by_label(labels):
+    """
+    Group node IDs by cluster label
+
+    Args:
+        labels: Cluster label per matrix index
+
+    Returns:
+        dict: label -> list of node IDs, in ascending label order
+    """
+    # One stable sort plus a scan for group starts instead of a Python loop
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    uniq, starts = np.unique(labels[order], return_index=True)
+    bounds = np.append(starts, len(labels))
+    return {
+        label: node_ids[order[bounds[k]:bounds[k + 1]]].tolist()
+        for k, label in enumerate(uniq.tolist())
+    }
+
+def build_connected_clusters(labels, components=None):
+    """
+    Build cluster mapping ensuring each cluster is connected
+
+    Args:
+        labels: Cluster labels from labels_at
+        components: Optional split_labels(labels) result, reused instead of
+            searching again
+
+    Returns:
+        dict: cluster id -> list of node IDs, one entry per connected piece
+    """
+    if components is None:
+        components = split_labels(labels)
+    
+    return {
+        cluster_id: nodes
+        for cluster_id, nodes in enumerate(group_by_label(components).values())
+    }
+
+# Average-linkage merge matrix from a single fit
+linkage_matrix = None
+
+def fit_once(dist_matrix):
+    """
+    Build the full average-linkage tree once and keep its merges
+
+    SciPy's linkage runs the nearest-neighbor-chain algorithm on the
+    condensed distances, the same backend server.py clusters with.
+
+    Args:
+        dist_matrix: Precomputed N x N distance matrix
+
+    Returns:
+        np.ndarray: SciPy linkage matrix, one row per merge
+    """
+    global linkage_matrix
+    linkage_matrix = linkage(squareform(dist_matrix, checks=False), method='average')
+    return linkage_matrix
+
+def labels_at(threshold):
+    """
+    Cut the cached dendrogram at a distance threshold
+
+    Gives the same partition as AgglomerativeClustering with
+    distance_threshold=threshold, without re-running the agglomeration.
+
+    Args:
+        threshold: Distance threshold
+
+    Returns:
+        np.ndarray: Cluster label per matrix index
+    """
+    Z = linkage_matrix if linkage_matrix is not None else fit_once(dist_matrix)
+    # fcluster keeps merges at or below t, sklearn only those strictly below
+    return fcluster(Z, t=np.nextafter(threshold, -np.inf), criterion='distance')
+
+def count_disconnected(labels, components):
+    """
+    Count clusters whose nodes fall into more than one connected piece
+
+    Args:
+        labels: Cluster label per matrix index
+        components: split_labels(labels) result
+
+    Returns:
+        int: Number of disconnected clusters
+    """
+    piece_labels = np.asarray(labels)[np.unique(components, return_index=True)[1]]
+    return int(np.count_nonzero(np.unique(piece_labels, return_counts=True)[1] > 1))
+
+def test_connectivity_fix(threshold=0.1, verify_old=False):
+    """
+    Test that all clusters are now connected
+
+    Args:
+        threshold: Distance threshold for the dendrogram cut
+        verify_old: Also count how many clusters the plain cut left
+            disconnected; skipped by default since only the fix is checked
+    """
+    load_data()
+    labels = labels_at(threshold)
     
     print(f"Testing connectivity fix at threshold {threshold}")
     
-    # Test old approach
-    old_cluster_map = {}
-    for idx, label in enumerate(labels):
-        old_cluster_map.setdefault(label, []).append(index_node[idx])
+    # Connected pieces of every cluster, shared by both measurements
+    components = split_labels(labels)
+    num_old_clusters = len(np.unique(labels))
     
-    old_disconnected = 0
-    for nodes in old_cluster_map.values():
-        if len(nodes) > 1:
-            subgraph = G.subgraph(nodes)
-            if nx.number_connected_components(subgraph) > 1:
-                old_disconnected += 1
+    # Test old approach
+    if verify_old:
+        old_disconnected = count_disconnected(labels, components)
+        print(f"Old approach: {old_disconnected}/{num_old_clusters} clusters disconnected")
     
     # Test new approach
-    new_cluster_map = build_connected_clusters(labels)
+    new_cluster_map = build_connected_clusters(labels, components)
     
+    # Re-check the clusters actually returned with NetworkX, independently
+    # of the csgraph split that produced them
     new_disconnected = 0
     for nodes in new_cluster_map.values():
-        if len(nodes) > 1:
-            subgraph = G.subgraph(nodes)
-            if nx.number_connected_components(subgraph) > 1:
-                new_disconnected += 1
+        if len(nodes) > 1 and not nx.is_connected(G.subgraph(nodes)):
+            new_disconnected += 1
     
-    print(f"Old approach: {old_disconnected}/{len(old_cluster_map)} clusters disconnected")
     print(f"New approach: {new_disconnected}/{len(new_cluster_map)} clusters disconnected")
-    print(f"Clusters before fix: {len(old_cluster_map)}")
+    print(f"Clusters before fix: {num_old_clusters}")
     print(f"Clusters after fix: {len(new_cluster_map)}")
     
     return new_disconnected == 0
 
-# Test the fix
-success = test_connectivity_fix(0.1)
-print(f"\nFix successful: {success}")
\ No newline at end of file
+def run_threshold(threshold, verify_old=False):
+    """Run test_connectivity_fix, returning (success, printed report)."""
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        success = test_connectivity_fix(threshold, verify_old)
+    return success, report.getvalue()
+
+def sweep_thresholds(thresholds, verify_old=False, processes=None):
+    """
+    Test several thresholds in parallel worker processes.
+    
+    The dendrogram is built before the pool starts so forked workers
+    inherit it, and they share the memory-mapped distance matrix through
+    the page cache instead of copying it.
+    
+    Args:
+        thresholds: Distance thresholds to test
+        verify_old: Passed through to test_connectivity_fix
+        processes: Number of worker processes (default: os.cpu_count())
+        
+    Returns:
+        bool: True if the fix holds at every threshold
+    """
+    load_data()
+    if linkage_matrix is None:
+        fit_once(dist_matrix)
+    
+    processes = processes or os.cpu_count() or 1
+    results = []
+    # imap (not imap_unordered) prints the reports in threshold order
+    with mp.Pool(min(processes, len(thresholds))) as pool:
+        for success, report in pool.imap(functools.partial(run_threshold, verify_old=verify_old), thresholds):
+            print(report, end="")
+            results.append(success)
+    
+    return all(results)
+
+if __name__ == "__main__":
+    load_data()
+    
+    # Test the fix; extra arguments are thresholds to sweep in parallel
+    if len(sys.argv) > 1:
+        success = sweep_thresholds([float(t) for t in sys.argv[1:]], verify_old=True)
+    else:
+        success = test_connectivity_fix(0.1, verify_old=True)
+    print(f"\nFix successful: {success}")
\ No newline at end of file
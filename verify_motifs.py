@@ -3,17 +3,35 @@
 Verification script to analyze the extracted motifs and demonstrate the results.
 """
 
-import json
+import heapq
+import operator
 
-def load_motifs(filepath):
-    """Load motifs from JSON file."""
-    with open(filepath, 'r') as f:
-        return json.load(f)
+import ijson
 
-def analyze_motifs(motifs_data):
+def iter_motifs(filepath):
+    """Stream motifs from the JSON file one at a time."""
+    with open(filepath, 'rb') as f:
+        yield from ijson.items(f, 'motifs.item', use_float=True)
+
+def load_statistics(filepath):
+    """Load only the statistics block from the JSON file."""
+    with open(filepath, 'rb') as f:
+        return next(ijson.items(f, 'statistics', use_float=True))
+
+def analyze_motifs(filepath):
     """Analyze and display motif statistics."""
-    motifs = motifs_data['motifs']
-    stats = motifs_data['statistics']
+    stats = load_statistics(filepath)
+    node_example = 1
+    
+    # One streaming pass keeps only the first 10 motifs and the example
+    # node's motifs instead of the whole decoded file
+    sample_motifs = []
+    node_motifs = []
+    for motif in iter_motifs(filepath):
+        if len(sample_motifs) < 10:
+            sample_motifs.append(motif)
+        if motif['source_node'] == node_example:
+            node_motifs.append(motif)
     
     print("=== MOTIF EXTRACTION ANALYSIS ===")
     print(f"Total motifs extracted: {stats['total_motifs']}")
@@ -22,12 +40,10 @@ def analyze_motifs(motifs_data):
     
     # Show sample motifs for first few nodes
     print("\n=== SAMPLE MOTIFS (First 10) ===")
-    for i, motif in enumerate(motifs[:10]):
+    for i, motif in enumerate(sample_motifs):
         print(f"Motif {i+1}: Node {motif['source_node']} -> Node {motif['neighbor_node']} (weight: {motif['edge_weight']})")
     
     # Show motifs for a specific node as example
-    node_example = 1
-    node_motifs = [m for m in motifs if m['source_node'] == node_example]
     print(f"\n=== ALL MOTIFS FOR NODE {node_example} ===")
     print(f"Node {node_example} has {len(node_motifs)} one-hop connections:")
     for motif in node_motifs:
@@ -36,9 +52,10 @@ def analyze_motifs(motifs_data):
     # Weight distribution analysis
     print(f"\n=== WEIGHT DISTRIBUTION ===")
     weight_dist = stats['weight_distribution']
-    sorted_weights = sorted(weight_dist.items(), key=lambda x: x[1], reverse=True)
+    # Partial selection: only the top 10 are ever shown
+    sorted_weights = heapq.nlargest(10, weight_dist.items(), key=operator.itemgetter(1))
     print("Top 10 most common edge weights:")
-    for weight, count in sorted_weights[:10]:
+    for weight, count in sorted_weights:
         print(f"  Weight {weight}: {count} edges")
     
     return True
@@ -49,10 +66,8 @@ def main():
     
     try:
         print("Loading extracted motifs...")
-        motifs_data = load_motifs(motifs_file)
-        
         print("Analyzing motifs...")
-        analyze_motifs(motifs_data)
+        analyze_motifs(motifs_file)
         
         print("\n=== VERIFICATION COMPLETE ===")
         print("✓ Motifs successfully extracted and verified")
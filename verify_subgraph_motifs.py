@@ -3,16 +3,74 @@
 Verification script for subgraph motifs.
 """
 
-import json
+import heapq
+import operator
+
+import ijson
+import numpy as np
+
+MOTIFS_FILE = 'data/facebook_motifs.json'
+
+def iter_motifs(filepath):
+    """Stream motifs from the JSON file one at a time."""
+    with open(filepath, 'rb') as f:
+        yield from ijson.items(f, 'motifs.item', use_float=True)
+
+def load_statistics(filepath):
+    """Load only the statistics block from the JSON file."""
+    with open(filepath, 'rb') as f:
+        return next(ijson.items(f, 'statistics', use_float=True))
+
+def to_columns(motif):
+    """
+    Replace a motif's list of edge dicts with parallel edge arrays.
+    
+    Args:
+        motif: Motif dict as stored in the JSON file
+        
+    Returns:
+        dict: The motif's scalar fields plus edge_from, edge_to, edge_weight
+        and the boolean masks edge_is_source / edge_is_internal
+    """
+    edges = motif['edges']
+    num_edges = len(edges)
+    edge_type = [e['edge_type'] for e in edges]
+    
+    return {
+        'source_node': motif['source_node'],
+        'neighbors': motif['neighbors'],
+        'num_neighbors': motif['num_neighbors'],
+        'num_edges': motif['num_edges'],
+        'edge_from': np.fromiter((e['from'] for e in edges), dtype=np.int64, count=num_edges),
+        'edge_to': np.fromiter((e['to'] for e in edges), dtype=np.int64, count=num_edges),
+        'edge_weight': np.fromiter((e['weight'] for e in edges), dtype=np.float64, count=num_edges),
+        'edge_is_source': np.fromiter((t == 'source_to_neighbor' for t in edge_type), dtype=bool, count=num_edges),
+        'edge_is_internal': np.fromiter((t == 'neighbor_to_neighbor' for t in edge_type), dtype=bool, count=num_edges)
+    }
 
 def analyze_subgraph_motifs():
     """Analyze the extracted subgraph motifs."""
     
-    with open('data/facebook_motifs.json', 'r') as f:
-        motifs_data = json.load(f)
+    stats = load_statistics(MOTIFS_FILE)
     
-    motifs = motifs_data['motifs']
-    stats = motifs_data['statistics']
+    # Single streaming pass: keep the running smallest/largest motif, the
+    # first medium one and the complexity counts, never the full list
+    small_motif = None
+    large_motif = None
+    medium_motif = None
+    num_with_internal_edges = 0
+    num_motifs = 0
+    for m in iter_motifs(MOTIFS_FILE):
+        num_motifs += 1
+        if small_motif is None or m['num_neighbors'] < small_motif['num_neighbors']:
+            small_motif = m
+        if large_motif is None or m['num_neighbors'] > large_motif['num_neighbors']:
+            large_motif = m
+        if medium_motif is None and 5 <= m['num_neighbors'] <= 10:
+            medium_motif = m
+        if any(e['edge_type'] == 'neighbor_to_neighbor' for e in m['edges']):
+            num_with_internal_edges += 1
+    num_without_internal_edges = num_motifs - num_with_internal_edges
     
     print("=== SUBGRAPH MOTIF ANALYSIS ===")
     print(f"Total motifs (one per node): {stats['total_motifs']}")
@@ -22,53 +80,46 @@ def analyze_subgraph_motifs():
     # Show example motifs
     print("\n=== EXAMPLE MOTIFS ===")
     
-    # Find a few interesting motifs of different sizes
-    small_motif = min(motifs, key=lambda m: m['num_neighbors'])
-    large_motif = max(motifs, key=lambda m: m['num_neighbors'])
-    medium_motifs = [m for m in motifs if 5 <= m['num_neighbors'] <= 10]
-    
     def show_motif(motif, label):
+        # Columnar edges only for the few motifs actually printed
+        motif = to_columns(motif)
         print(f"\n{label}:")
         print(f"  Source node: {motif['source_node']}")
         print(f"  Neighbors: {motif['neighbors']}")
         print(f"  Total edges in motif: {motif['num_edges']}")
         
         # Show edges
-        source_edges = [e for e in motif['edges'] if e['edge_type'] == 'source_to_neighbor']
-        neighbor_edges = [e for e in motif['edges'] if e['edge_type'] == 'neighbor_to_neighbor']
+        def show_edges(mask, label):
+            selected = np.flatnonzero(mask)
+            print(f"  {label} edges ({len(selected)}):")
+            shown = selected[:5]  # Show first 5
+            for u, v, w in zip(motif['edge_from'][shown].tolist(),
+                               motif['edge_to'][shown].tolist(),
+                               motif['edge_weight'][shown].tolist()):
+                print(f"    {u} -> {v} (weight: {w})")
+            if len(selected) > 5:
+                print(f"    ... and {len(selected) - 5} more")
         
-        print(f"  Source-to-neighbor edges ({len(source_edges)}):")
-        for edge in source_edges[:5]:  # Show first 5
-            print(f"    {edge['from']} -> {edge['to']} (weight: {edge['weight']})")
-        if len(source_edges) > 5:
-            print(f"    ... and {len(source_edges) - 5} more")
-            
-        print(f"  Neighbor-to-neighbor edges ({len(neighbor_edges)}):")
-        for edge in neighbor_edges[:5]:  # Show first 5
-            print(f"    {edge['from']} -> {edge['to']} (weight: {edge['weight']})")
-        if len(neighbor_edges) > 5:
-            print(f"    ... and {len(neighbor_edges) - 5} more")
+        show_edges(motif['edge_is_source'], "Source-to-neighbor")
+        show_edges(motif['edge_is_internal'], "Neighbor-to-neighbor")
     
     show_motif(small_motif, f"SMALLEST MOTIF ({small_motif['num_neighbors']} neighbors)")
     
-    if medium_motifs:
-        show_motif(medium_motifs[0], f"MEDIUM MOTIF ({medium_motifs[0]['num_neighbors']} neighbors)")
+    if medium_motif is not None:
+        show_motif(medium_motif, f"MEDIUM MOTIF ({medium_motif['num_neighbors']} neighbors)")
     
     show_motif(large_motif, f"LARGEST MOTIF ({large_motif['num_neighbors']} neighbors)")
     
     # Analyze motif complexity
     print(f"\n=== MOTIF COMPLEXITY ANALYSIS ===")
     
-    motifs_with_internal_edges = [m for m in motifs if any(e['edge_type'] == 'neighbor_to_neighbor' for e in m['edges'])]
-    motifs_without_internal_edges = [m for m in motifs if not any(e['edge_type'] == 'neighbor_to_neighbor' for e in m['edges'])]
-    
-    print(f"Motifs with internal edges (neighbors connected): {len(motifs_with_internal_edges)}")
-    print(f"Motifs without internal edges (star pattern): {len(motifs_without_internal_edges)}")
+    print(f"Motifs with internal edges (neighbors connected): {num_with_internal_edges}")
+    print(f"Motifs without internal edges (star pattern): {num_without_internal_edges}")
     
     # Show size distribution
     print(f"\n=== SIZE DISTRIBUTION (Top 10) ===")
     size_dist = stats['motif_size_distribution']
-    sorted_sizes = sorted(size_dist.items(), key=lambda x: x[1], reverse=True)[:10]
+    sorted_sizes = heapq.nlargest(10, size_dist.items(), key=operator.itemgetter(1))
     
     for size, count in sorted_sizes:
         print(f"  {size} neighbors: {count} motifs")
@@ -77,7 +128,7 @@ def analyze_subgraph_motifs():
     print(f"✓ Each motif is a complete subgraph centered on one source node")
     print(f"✓ Includes all neighbors at distance 1 from source")
     print(f"✓ Includes edges between neighbors when they exist")
-    print(f"✓ Total of {len(motifs)} motifs (one per node)")
+    print(f"✓ Total of {num_motifs} motifs (one per node)")
 
 if __name__ == "__main__":
     analyze_subgraph_motifs()
\ No newline at end of file